@@ -5,6 +5,7 @@ import numpy as np
 from math import ceil
 from statistics import mean
 import matplotlib.pyplot as plt
+from ring_geometry import ring_simulations, monitor_point, monitor_component, cartesian_field
 
 
 def main():
@@ -31,23 +32,39 @@ def main():
 
     src = mp.Source(mp.GaussianSource(fcen, fwidth=df), mp.Hz, mp.Vector3(r + 0.1))
 
-    sim = mp.Simulation(cell_size=mp.Vector3(sxy, sxy),
-                        geometry=[c1, c2],
-                        sources=[src],
-                        resolution=10,
-                        symmetries=[mp.Mirror(mp.Y)],
-                        boundary_layers=[mp.PML(dpml)])
+    # Concentric cylinders are rotationally symmetric, so ring_simulations solves them in cylindrical coordinates,
+    # once for every m that can resonate below the top of the source spectrum, instead of in the full sxy x sxy
+    # cell. Other geometries get a single Cartesian simulation with every applicable mirror symmetry instead.
 
-    h = mp.Harminv(mp.Ex, mp.Vector3(r + 0.1), fcen, df)
-    sim.run(mp.after_sources(h), until_after_sources=200)
+    sims = ring_simulations(mp.Vector3(sxy, sxy), [c1, c2], [src],
+                            resolution=10,
+                            boundary_layers=[mp.PML(dpml)])
 
-    print(f'Harminv found {len(h.modes)} resonant modes(s).')
-    for mode in h.modes:
-        print(f'The resonant mode with f={mode.freq} has Q={mode.Q}')
+    for sim in sims:
+        h = mp.Harminv(monitor_component(sim, mp.Ex), monitor_point(sim, mp.Vector3(r + 0.1)), fcen, df)
+        sim.run(mp.after_sources(h), until_after_sources=200)
 
-    sim.plot2D(fields=mp.Ex,
-           field_parameters={'alpha':0.8, 'cmap':'RdBu', 'interpolation':'none'},
-           boundary_parameters={'hatch':'o', 'linewidth':1.5, 'facecolor':'y', 'edgecolor':'b', 'alpha':0.3})
+        # m and -m are degenerate, so only report each pair once
+        if sim.dimensions == mp.CYLINDRICAL and sim.m < 0:
+            continue
+        label = f' for m={sim.m}' if sim.dimensions == mp.CYLINDRICAL else ''
+        print(f'Harminv found {len(h.modes)} resonant modes(s){label}.')
+        for mode in h.modes:
+            print(f'The resonant mode with f={mode.freq} has Q={mode.Q}')
+
+    if sims[0].dimensions == mp.CYLINDRICAL:
+        # rebuild the Cartesian field map from the radial solutions rather than simulating it; summing over both m
+        # and -m gives the standing-wave field of the point source, as the Cartesian run would show it
+        x, y, Ex = cartesian_field(sims, mp.Ex)
+        plt.imshow(np.real(Ex).transpose(), cmap='RdBu', interpolation='none', origin='lower', alpha=0.8,
+                   extent=[x[0], x[-1], y[0], y[-1]])
+        for c in (c1, c2):
+            plt.gca().add_patch(plt.Circle((c.center.x, c.center.y), c.radius, fill=False, edgecolor='b'))
+        plt.title(f'Ex reconstructed from m = {sims[0].m} to {sims[-1].m}')
+    else:
+        sims[0].plot2D(fields=mp.Ex,
+                       field_parameters={'alpha':0.8, 'cmap':'RdBu', 'interpolation':'none'},
+                       boundary_parameters={'hatch':'o', 'linewidth':1.5, 'facecolor':'y', 'edgecolor':'b', 'alpha':0.3})
     plt.show()
 
 
@@ -0,0 +1,351 @@
+from __future__ import division
+
+import meep as mp
+import numpy as np
+from math import ceil, pi
+
+# Geometry front-end for ring resonators. A 2D (or 3D) Cartesian description made only of concentric z-axis cylinders
+# is rotationally symmetric, so it is solved once per angular index m in a 1D (or r-z) cylindrical cell instead of the
+# full Cartesian cell. Anything else falls back to a Cartesian simulation with every mirror symmetry the geometry,
+# materials, boundary layers and sources allow.
+
+tol = 1e-12
+
+e_components = {mp.Ex: mp.X, mp.Ey: mp.Y, mp.Ez: mp.Z}
+h_components = {mp.Hx: mp.X, mp.Hy: mp.Y, mp.Hz: mp.Z}
+
+# Cartesian component -> (radial component, azimuthal component); z components map onto themselves
+cylindrical_components = {mp.Ex: (mp.Er, mp.Ep), mp.Ey: (mp.Er, mp.Ep),
+                          mp.Hx: (mp.Hr, mp.Hp), mp.Hy: (mp.Hr, mp.Hp),
+                          mp.Ez: (mp.Ez, None), mp.Hz: (mp.Hz, None)}
+
+
+def coord(v, d):
+    return {mp.X: v.x, mp.Y: v.y, mp.Z: v.z}[d]
+
+
+def is_zero(v):
+    return abs(v.x) < tol and abs(v.y) < tol and abs(v.z) < tol
+
+
+def tensors(medium):
+    # (diagonal, off-diagonal) pairs of every linear tensor in a Medium: epsilon, mu, the susceptibility weights
+    # and the (diagonal-only) conductivities
+    pairs = [(medium.epsilon_diag, medium.epsilon_offdiag), (medium.mu_diag, medium.mu_offdiag)]
+    for sus in list(medium.E_susceptibilities) + list(medium.H_susceptibilities):
+        pairs.append((sus.sigma_diag, sus.sigma_offdiag))
+    for name in ('D_conductivity_diag', 'B_conductivity_diag'):
+        pairs.append((getattr(medium, name, mp.Vector3()), mp.Vector3()))
+    return pairs
+
+
+def is_gyrotropic(medium):
+    return any(getattr(sus, 'bias', None) is not None
+               for sus in list(medium.E_susceptibilities) + list(medium.H_susceptibilities))
+
+
+def has_chi2(medium):
+    return any(not is_zero(getattr(medium, name, mp.Vector3())) for name in ('E_chi2_diag', 'H_chi2_diag'))
+
+
+def has_chi3(medium):
+    return any(not is_zero(getattr(medium, name, mp.Vector3())) for name in ('E_chi3_diag', 'H_chi3_diag'))
+
+
+def is_mirror_symmetric(medium):
+    # Off-diagonal tensors couple the mirror direction to the in-plane ones, a gyrotropic bias is a pseudovector
+    # that no mirror preserves, and chi2 maps odd fields onto even polarizations. Anisotropic conductivities are
+    # refused too, to stay on the safe side.
+    if not isinstance(medium, mp.Medium) or is_gyrotropic(medium) or has_chi2(medium):
+        return False
+    if not all(is_zero(offdiag) for diag, offdiag in tensors(medium)):
+        return False
+    conductivities = [getattr(medium, name, mp.Vector3()) for name in ('D_conductivity_diag', 'B_conductivity_diag')]
+    return all(abs(cond.x - cond.y) < tol and abs(cond.x - cond.z) < tol for cond in conductivities)
+
+
+def is_rotationally_symmetric(medium):
+    # Uniaxial media along z (x == y, no off-diagonal terms) are invariant under rotations about z. A gyrotropic
+    # bias breaks the m/-m degeneracy and nonlinearities mix different m, so neither can be solved one m at a time.
+    if not isinstance(medium, mp.Medium) or is_gyrotropic(medium) or has_chi2(medium) or has_chi3(medium):
+        return False
+    return all(is_zero(offdiag) and abs(diag.x - diag.y) < tol for diag, offdiag in tensors(medium))
+
+
+def is_point_source(src):
+    if type(src) is not mp.Source or src.component not in cylindrical_components:
+        return False
+    return (src.amp_func is None and not getattr(src, 'amp_func_file', '')
+            and getattr(src, 'amp_data', None) is None)
+
+
+def materials(geometry, **kwargs):
+    return [obj.material for obj in geometry] + [kwargs.get('default_material', mp.Medium())]
+
+
+def ring_center(cell_size, geometry, sources, **kwargs):
+    """Returns the common center of a concentric-cylinder geometry, or None if it cannot be reduced."""
+    if not geometry or kwargs.get('k_point') or 'dimensions' in kwargs:
+        return None
+    if not is_zero(kwargs.get('geometry_center', mp.Vector3())):
+        return None
+    if cell_size.x == 0 or cell_size.y == 0:
+        return None
+
+    # material functions, media with an x-y anisotropy, gyrotropy or nonlinearity break the rotational symmetry
+    if not all(is_rotationally_symmetric(material) for material in materials(geometry, **kwargs)):
+        return None
+
+    center = geometry[0].center
+    for obj in geometry:
+        # Cone and the other Cylinder subclasses are not invariant along z, so only plain cylinders qualify
+        if type(obj) is not mp.Cylinder:
+            return None
+        if abs(obj.axis.x) > tol or abs(obj.axis.y) > tol:
+            return None
+        if abs(obj.center.x - center.x) > tol or abs(obj.center.y - center.y) > tol:
+            return None
+
+    # point sources (possibly extended along z) are decomposed into azimuthal harmonics; anything else is not
+    for src in sources:
+        if not is_point_source(src) or src.size.x != 0 or src.size.y != 0:
+            return None
+        # a point source on the axis has no finite radial amplitude to scale against other sources (see
+        # cylindrical_sources), so it is only reduced on its own
+        if len(sources) > 1 and cylindrical_point(src.center, center).x < tol:
+            return None
+
+    return mp.Vector3(center.x, center.y)
+
+
+def m_range(geometry, sources, **kwargs):
+    """Returns every m, positive and negative, that can resonate below the highest source frequency.
+
+    A whispering-gallery mode needs m <= 2 pi R n f, with R the outermost radius and n the largest index.
+    """
+    fmax = 0
+    for src in sources:
+        if not isinstance(src.src, mp.GaussianSource):
+            raise ValueError('ms must be given explicitly unless every source is a GaussianSource')
+        fmax = max(fmax, src.src.frequency + src.src.fwidth)
+
+    nmax = 1
+    for material in materials(geometry, **kwargs):
+        eps = max(material.epsilon_diag.x, material.epsilon_diag.y, material.epsilon_diag.z)
+        mu = max(material.mu_diag.x, material.mu_diag.y, material.mu_diag.z)
+        nmax = max(nmax, np.sqrt(eps * mu))
+
+    rmax = max(obj.radius for obj in geometry)
+    m_max = int(ceil(2 * pi * rmax * nmax * fmax))
+    return list(range(-m_max, m_max + 1))
+
+
+def cylindrical_point(v, center=mp.Vector3()):
+    return mp.Vector3(np.hypot(v.x - center.x, v.y - center.y), 0, v.z)
+
+
+def cylindrical_sources(sources, center, m):
+    # A Cartesian point source at (r0, phi0) is delta(r - r0) delta(phi - phi0) / r0, whose azimuthal harmonic is
+    # delta(r - r0) e^{-im phi0} / (2 pi r0) e^{im phi}; the transverse polarization splits into r and phi parts:
+    # x = cos(phi0) r - sin(phi0) phi, y = sin(phi0) r + cos(phi0) phi.
+    # On the axis phi0 is undefined: z components only excite m = 0, and x = (e^{i phi} + e^{-i phi})/2 r
+    # - (e^{i phi} - e^{-i phi})/2i phi (likewise for y) only excites m = +-1; the source is dropped for other m.
+    # The 1/r0 of the delta function diverges there, so an on-axis source (which ring_center only allows on its
+    # own) keeps its amplitude and the fields are correct up to an overall scale.
+    cyl_sources = []
+    for src in sources:
+        position = cylindrical_point(src.center, center)
+        size = mp.Vector3(0, 0, src.size.z)
+        c_r, c_p = cylindrical_components[src.component]
+        if position.x < tol:
+            amplitude = src.amplitude
+            s = np.sign(m)
+            if c_p is None:
+                parts = [(c_r, 1)] if m == 0 else []
+            elif abs(m) != 1:
+                parts = []
+            elif src.component in (mp.Ex, mp.Hx):
+                parts = [(c_r, 0.5), (c_p, 0.5j * s)]
+            else:
+                parts = [(c_r, -0.5j * s), (c_p, 0.5)]
+        else:
+            phi0 = np.arctan2(src.center.y - center.y, src.center.x - center.x)
+            amplitude = src.amplitude * np.exp(-1j * m * phi0) / (2 * pi * position.x)
+            if c_p is None:
+                parts = [(c_r, 1)]
+            elif src.component in (mp.Ex, mp.Hx):
+                parts = [(c_r, np.cos(phi0)), (c_p, -np.sin(phi0))]
+            else:
+                parts = [(c_r, np.sin(phi0)), (c_p, np.cos(phi0))]
+        for c, weight in parts:
+            if abs(weight) > tol:
+                cyl_sources.append(mp.Source(src.src, c, position, size=size, amplitude=amplitude * weight))
+    return cyl_sources
+
+
+def cylindrical_geometry(geometry, center):
+    # A cylinder of radius R is the slab 0 <= r <= R in the cylindrical cell. Keeping the original order keeps
+    # the precedence of later objects over earlier ones, so rings built from overlapping cylinders carry over.
+    cyl_geometry = []
+    for obj in geometry:
+        cyl_geometry.append(mp.Block(center=mp.Vector3(obj.radius / 2, 0, obj.center.z - center.z),
+                                     size=mp.Vector3(obj.radius, 1e20, obj.height),
+                                     material=obj.material))
+    return cyl_geometry
+
+
+def mirror_phase(cell_size, geometry, sources, d, **kwargs):
+    """Returns the phase of an applicable mirror symmetry through the origin normal to d, or None."""
+    if coord(cell_size, d) == 0:
+        return None
+    if not is_zero(kwargs.get('geometry_center', mp.Vector3())):
+        return None
+
+    # a PML or absorber on only one side of the cell along d is not mirrored
+    for layer in kwargs.get('boundary_layers', []):
+        if layer.side != mp.ALL and layer.direction in (mp.ALL, d):
+            return None
+
+    # material functions have no known parity, and some media are never mirror symmetric
+    if not all(is_mirror_symmetric(material) for material in materials(geometry, **kwargs)):
+        return None
+
+    for obj in geometry:
+        if abs(coord(obj.center, d)) > tol:
+            return None
+        if type(obj) is mp.Sphere:
+            continue
+        if type(obj) in (mp.Cylinder, mp.Cone):
+            axes = [obj.axis]
+            # a cone pointing along d is not mirror symmetric unless it is a plain cylinder
+            if type(obj) is mp.Cone and abs(abs(coord(obj.axis, d)) - obj.axis.norm()) < tol:
+                return None
+        elif type(obj) in (mp.Block, mp.Ellipsoid):
+            axes = [obj.e1, obj.e2, obj.e3]
+        else:
+            return None
+        # each axis must lie either along d or in the mirror plane
+        for axis in axes:
+            along = abs(abs(coord(axis, d)) - axis.norm()) < tol
+            if not along and abs(coord(axis, d)) > tol:
+                return None
+
+    # E components in the mirror plane are even for phase +1, H components in the plane are odd (pseudovector)
+    phases = set()
+    for src in sources:
+        if not is_point_source(src) or abs(coord(src.center, d)) > tol:
+            return None
+        if src.component in e_components:
+            phases.add(-1 if e_components[src.component] == d else 1)
+        elif src.component in h_components:
+            phases.add(1 if h_components[src.component] == d else -1)
+        else:
+            return None
+
+    if len(phases) != 1:
+        return None
+    return phases.pop()
+
+
+def mirror_symmetries(cell_size, geometry, sources, **kwargs):
+    symmetries = []
+    for d in (mp.X, mp.Y, mp.Z):
+        phase = mirror_phase(cell_size, geometry, sources, d, **kwargs)
+        if phase is not None:
+            symmetries.append(mp.Mirror(d, phase=phase))
+    return symmetries
+
+
+def ring_simulations(cell_size, geometry, sources, ms=None, **kwargs):
+    """Builds the cheapest equivalent simulations for a Cartesian ring description.
+
+    Concentric cylinders are solved in cylindrical coordinates, one simulation per m in ms (by default every m from
+    m_range); an m that no source couples to is skipped. Otherwise a single Cartesian simulation is returned with
+    every applicable mirror symmetry, unless symmetries were given explicitly. Use monitor_point and
+    monitor_component to place Harminv/field monitors in either case.
+    """
+    center = ring_center(cell_size, geometry, sources, **kwargs)
+
+    if center is None:
+        if 'symmetries' not in kwargs and not kwargs.get('k_point'):
+            kwargs['symmetries'] = mirror_symmetries(cell_size, geometry, sources, **kwargs)
+        return [mp.Simulation(cell_size=cell_size, geometry=geometry, sources=sources, **kwargs)]
+
+    if ms is None:
+        ms = m_range(geometry, sources, **kwargs)
+
+    # the radial cell extends to the nearest Cartesian cell wall, so the padding and PML thickness are unchanged
+    sr = min(cell_size.x / 2 - abs(center.x), cell_size.y / 2 - abs(center.y))
+    kwargs.pop('symmetries', None)
+
+    sims = []
+    for m in ms:
+        cyl_sources = cylindrical_sources(sources, center, m)
+        if sources and not cyl_sources:
+            continue
+        sims.append(mp.Simulation(cell_size=mp.Vector3(sr, 0, cell_size.z),
+                                  geometry=cylindrical_geometry(geometry, center),
+                                  sources=cyl_sources,
+                                  dimensions=mp.CYLINDRICAL,
+                                  m=m,
+                                  **kwargs))
+    return sims
+
+
+def monitor_point(sim, v, center=mp.Vector3()):
+    """Maps a Cartesian monitor point onto the simulation's coordinates (its radius for a cylindrical solve).
+
+    In a cylindrical solve the point must lie on the phi = 0 axis of the ring center, where monitor_component holds.
+    """
+    if sim.dimensions != mp.CYLINDRICAL:
+        return v
+    if abs(v.y - center.y) > tol or v.x < center.x:
+        raise ValueError(f'monitor point {v} is off the phi = 0 axis of the ring centered at {center}')
+    return cylindrical_point(v, center)
+
+
+def monitor_component(sim, c):
+    """Maps a Cartesian component onto the simulation's components on the phi = 0 axis."""
+    if sim.dimensions != mp.CYLINDRICAL:
+        return c
+    c_r, c_p = cylindrical_components[c]
+    return c_p if c in (mp.Ey, mp.Hy) else c_r
+
+
+def cartesian_field(sims, c, center=mp.Vector3(), z=0):
+    """Reconstructs a Cartesian field map from cylindrical solutions as the sum of f_m(r) e^{im phi} over m.
+
+    Pass the solutions for both m and -m to recover the physical (standing-wave) field of a real source; a lone
+    on-axis source is only reproduced up to an overall scale (see cylindrical_sources). Returns the x and y grid
+    coordinates and the complex field on that grid, indexed [x, y] like get_array.
+    """
+    if any(sim.dimensions != mp.CYLINDRICAL for sim in sims):
+        raise ValueError('cartesian_field needs simulations reduced to cylindrical coordinates')
+
+    sr = sims[0].cell_size.x
+    line_center = mp.Vector3(sr / 2, 0, z)
+    line_size = mp.Vector3(sr)
+
+    xy = np.linspace(-sr, sr, int(ceil(2 * sr * sims[0].resolution)) + 1)
+    x, y = np.meshgrid(xy, xy, indexing='ij')
+    rho = np.hypot(x, y)
+    phi = np.arctan2(y, x)
+
+    field = np.zeros(x.shape, dtype=complex)
+    for sim in sims:
+        r = sim.get_array_metadata(center=line_center, size=line_size)[0]
+
+        def radial(component):
+            f = sim.get_array(component=component, center=line_center, size=line_size, cmplx=True)
+            return np.interp(rho, r, np.real(f), right=0) + 1j * np.interp(rho, r, np.imag(f), right=0)
+
+        c_r, c_p = cylindrical_components[c]
+        if c_p is None:
+            f_m = radial(c_r)
+        elif c in (mp.Ex, mp.Hx):
+            f_m = radial(c_r) * np.cos(phi) - radial(c_p) * np.sin(phi)
+        else:
+            f_m = radial(c_r) * np.sin(phi) + radial(c_p) * np.cos(phi)
+        field += f_m * np.exp(1j * sim.m * phi)
+
+    return xy + center.x, xy + center.y, field